@@ -1,13 +1,26 @@
 #!/usr/bin/env python3
 
-import re
 import os
 import sys
+import ctypes
 import logging
 import subprocess
-from typing import Dict, List, Optional, Tuple
+from time import monotonic, sleep
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from contextlib import AbstractContextManager
 
+try:
+    # optional dependency: query the driver in-process via NVML instead of spawning nvidia-smi
+    import pynvml  # type: ignore[import-not-found]
+except ImportError:
+    pynvml = None  # type: ignore[assignment]
+
+try:
+    # optional dependency: update all PID controllers in one vectorized step
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment]
+
 
 logger = logging.getLogger('nvidia-fan-controller')
 
@@ -33,6 +46,11 @@ WantedBy=multi-user.target
 """
 
 
+def _clip(x: float, lo: float, hi: float) -> float:
+    """Clip x to [lo, hi] with plain comparisons, avoiding the variadic min/max built-ins."""
+    return lo if x < lo else (hi if x > hi else x)
+
+
 class PIDController:
     """
     PID Controller using variable names defined in:
@@ -56,6 +74,11 @@ class PIDController:
         e_total_max: upper bound for the accumulated error
 
     """
+    __slots__ = (
+        'u_min', 'u_max', 'u_start', 'reverse', 'Kp', 'Ki', 'Kd', 'gamma', 'alpha',
+        'e_min', 'e_max', 'e_total_min', 'e_total_max',
+        '_u', '_e_total', '_e_prev', '__x_target')
+
     def __init__(
             self,
             x_target: float,
@@ -104,8 +127,8 @@ class PIDController:
         self._e_prev = 0.
 
     def __repr__(self) -> str:
-        config = ', '.join(f'{k}={v:r}' for k, v in self.__dict__.items() if not k.startswith('_'))
-        state = ', '.join(f'{k}: {v:r}' for k, v in self.get_state().items())
+        config = ', '.join(f'{k}={getattr(self, k)!r}' for k in self.__slots__ if not k.startswith('_'))
+        state = ', '.join(f'{k}: {v!r}' for k, v in self.get_state().items())
         return f'{type(self).__name__}({config}) {{ {state} }}'
 
     def get_state(self) -> Dict[str, float]:
@@ -128,97 +151,404 @@ class PIDController:
             u: new value for the control variable :math:`u`
 
         """
-        e = x_obs - self.x_target
+        # hoist attribute lookups into locals; this runs once per GPU per tick
+        Kp, Ki, Kd = self.Kp, self.Ki, self.Kd
+        alpha = self.alpha
+        e_prev = self._e_prev
+
+        e = x_obs - self.__x_target
 
         # Clip residual.
-        e = max(self.e_min, min(self.e_max, e))
+        e = _clip(e, self.e_min, self.e_max)
 
         if self.reverse:
             e = -e
 
         # use Polyak smoothing for the proportional term
-        e_smooth = self.alpha * e + (1 - self.alpha) * self._e_prev
+        e_smooth = alpha * e + (1 - alpha) * e_prev
 
         # PID terms (proportional, integral, derivative)
         p = e_smooth
         i = e + self.gamma * self._e_total
-        d = e - self._e_prev
+        d = e - e_prev
 
         # control variable (clipped to provided range)
-        u = max(self.u_min, min(self.u_max, self.Kp * p + self.Ki * i + self.Kd * d))
+        u = _clip(Kp * p + Ki * i + Kd * d, self.u_min, self.u_max)
 
-        logger.debug(  # pylint: disable=logging-fstring-interpolation
-            "Kp * p + Ki * i + Kd * d = "
-            f"{self.Kp} * {p:.2f} + {self.Ki} * {i:.2f} + {self.Kd} * {d:.2f} = "
-            f"{self.Kp * p:.2f} + {self.Ki * i:.2f} + {self.Kd * d:.2f} = "
-            f"{self.Kp * p + self.Ki * i + self.Kd * d:.2f}, "
-            f"u_clipped = {u:.2f}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(  # pylint: disable=logging-fstring-interpolation
+                "Kp * p + Ki * i + Kd * d = "
+                f"{Kp} * {p:.2f} + {Ki} * {i:.2f} + {Kd} * {d:.2f} = "
+                f"{Kp * p:.2f} + {Ki * i:.2f} + {Kd * d:.2f} = "
+                f"{Kp * p + Ki * i + Kd * d:.2f}, "
+                f"u_clipped = {u:.2f}")
 
         # update state
         if u != self._u:
             self._u = u
-            self._e_total = max(self.e_total_min, min(self.e_total_max, i))
+            self._e_total = _clip(i, self.e_total_min, self.e_total_max)
             self._e_prev = e_smooth
 
         return self._u
 
 
+class PIDControllerBatch:
+    """
+    Vectorized equivalent of :class:`PIDController` that updates all controllers in one step.
+
+    The per-GPU state is kept in parallel numpy arrays, so a tick costs a handful of array ops in C
+    rather than running the scalar controller once per GPU in python bytecode. Requires numpy.
+
+    Args:
+        x_target: setpoint for process variable :math:`x`, shared by all controllers
+        u_min: minimal value of control variable :math:`u`
+        u_max: maximal value of control variable :math:`u`
+        u_start: per-GPU initial values of control variable :math:`u`
+        reverse: whether to flip the sign of the residuals (for reverse control task)
+        Kp: coefficient of proportionality term
+        Ki: coefficient of integral term
+        Kd: coefficient of derivative term
+        gamma: discount factor for exponentially annealing past contributions to integral term
+        alpha: smoothing parameter for computing a rolling average error
+        e_min: lower bound for the error = x_observed - x_target
+        e_max: upper bound for the error = x_observed - x_target
+        e_total_min: lower bound for the accumulated error
+        e_total_max: upper bound for the accumulated error
+
+    """
+    def __init__(
+            self,
+            x_target: float,
+            u_min: float,
+            u_max: float,
+            u_start: Sequence[float],
+            reverse: bool = False,
+            Kp: float = 0.5,
+            Ki: float = 1.0,
+            Kd: float = 1.0,
+            gamma: float = 0.9,
+            alpha: float = 0.5,
+            e_min: float = -float('inf'),
+            e_max: float = float('inf'),
+            e_total_min: float = -float('inf'),
+            e_total_max: float = float('inf')):
+
+        self.u_min = u_min
+        self.u_max = u_max
+        # float32 is plenty for temperatures and fan percentages and halves the state footprint
+        self.u_start = np.array(u_start, dtype=np.float32)
+        self.x_target = x_target
+        self.reverse = reverse
+        self.Kp = Kp
+        self.Ki = Ki
+        self.Kd = Kd
+        self.gamma = gamma
+        self.alpha = alpha
+        self.e_min = e_min
+        self.e_max = e_max
+        self.e_total_min = e_total_min
+        self.e_total_max = e_total_max
+        self.reset_state()
+
+    @property
+    def x_target(self) -> float:
+        return self.__x_target
+
+    @x_target.setter
+    def x_target(self, x_target_new: float) -> None:
+        self.__x_target = x_target_new
+        self.reset_state()
+
+    def reset_state(self) -> None:
+        self._u = self.u_start.copy()
+        self._e_total = np.zeros_like(self._u)
+        self._e_prev = np.zeros_like(self._u)
+
+    def get_state(self) -> Dict[str, Any]:
+        """Return a summary of the current state."""
+        return {
+            'u': self._u,
+            'e_prev': self._e_prev,
+            'e_total': self._e_total,
+            'x_target': self.x_target,
+        }
+
+    def __call__(self, x_obs: Sequence[float]) -> 'np.ndarray':
+        """
+        Update internal state of all controllers and return the new control variables :math:`u`.
+
+        Args:
+            x_obs: per-GPU observations of the process variable :math:`x`
+
+        Returns:
+            u: new values for the control variables :math:`u`
+
+        """
+        e = np.clip(np.asarray(x_obs, dtype=np.float32) - self.__x_target, self.e_min, self.e_max)
+
+        if self.reverse:
+            e = -e
+
+        # use Polyak smoothing for the proportional term
+        e_smooth = self.alpha * e + (1 - self.alpha) * self._e_prev
+
+        # PID terms (proportional, integral, derivative)
+        p = e_smooth
+        i = e + self.gamma * self._e_total
+        d = e - self._e_prev
+
+        # control variables (clipped to provided range)
+        u = np.clip(self.Kp * p + self.Ki * i + self.Kd * d, self.u_min, self.u_max)
+
+        # update state only where u changed
+        changed = u != self._u
+        self._u[changed] = u[changed]
+        self._e_total[changed] = np.clip(i, self.e_total_min, self.e_total_max)[changed]
+        self._e_prev[changed] = e_smooth[changed]
+
+        return self._u
+
+
+# argv pieces that never change; built once instead of on every call
+_SMI_QUERY_ARGS = ('--query-gpu=index,temperature.gpu,fan.speed', '--format=csv,noheader')
+_SMI_QUERY_CMD = ('nvidia-smi',) + _SMI_QUERY_ARGS
+
+
+def _parse_measurement(line: str) -> Optional[Tuple[int, int, int]]:
+    """Parse one 'index, temperature.gpu, fan.speed' CSV line; None if the line doesn't conform."""
+    try:
+        index, temperature, fan_speed = line.rstrip(' %\n').split(', ')
+        return int(index), int(temperature), int(fan_speed)
+    except ValueError:
+        return None
+
+
+class MeasurementStream(AbstractContextManager):
+    """
+    Context manager around a long-running ``nvidia-smi --loop`` child process whose output is read
+    incrementally, so that the process startup cost (fork/exec, CUDA library loading) is paid once
+    instead of on every polling interval.
+
+    Args:
+        interval_secs: number of seconds between consecutive snapshots emitted by nvidia-smi
+
+    """
+    def __init__(self, interval_secs: float):
+        self.interval_secs = interval_secs
+        self._process: Optional[subprocess.Popen] = None
+
+    def __enter__(self):
+        # nvidia-smi --loop only supports whole seconds
+        cmd = ('nvidia-smi', '--loop', str(max(1, round(self.interval_secs)))) + _SMI_QUERY_ARGS
+        logger.debug("Running cmd: %s", cmd)
+        self._process = subprocess.Popen(cmd, stdout=subprocess.PIPE, bufsize=1, text=True, close_fds=False)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait()
+            self._process = None
+
+    def read(self, num_gpus: int) -> List[Tuple[int, int, int]]:
+        """Block until the next complete snapshot of measurements is available."""
+        process = self._process
+        assert process is not None and process.stdout is not None  # established by __enter__
+        measurements: List[Tuple[int, int, int]] = []
+        while len(measurements) < num_gpus:
+            line = process.stdout.readline()
+            if not line:  # EOF: the child died, e.g. on driver reload
+                returncode = process.wait()
+                raise subprocess.CalledProcessError(returncode, process.args)
+            measurement = _parse_measurement(line)
+            if measurement is not None:
+                measurements.append(measurement)
+        return measurements  # [(index, temperature, fanspeed)]
+
+
+class _XNVCtrl:
+    """
+    In-process bindings to the NV-CONTROL X extension (libXNVCtrl) via ctypes.
+
+    nvidia-settings is itself a thin client of this library, so calling it directly replaces a
+    process spawn plus X authorization handshake per assignment with a plain shared-library call.
+    The display connection and library handles are opened once and reused for every call.
+    """
+
+    # target types and attribute ids from NVCtrl.h
+    TARGET_TYPE_GPU = 1
+    TARGET_TYPE_COOLER = 5
+    GPU_COOLER_MANUAL_CONTROL = 319   # aka GPUFanControlState
+    THERMAL_COOLER_LEVEL = 320        # aka GPUTargetFanSpeed
+
+    def __init__(self):
+        self._x11 = ctypes.CDLL('libX11.so.6')
+        self._xnvctrl = ctypes.CDLL('libXNVCtrl.so.0')
+
+        self._x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        self._x11.XOpenDisplay.restype = ctypes.c_void_p
+        self._x11.XFlush.argtypes = [ctypes.c_void_p]
+        self._xnvctrl.XNVCTRLQueryTargetCount.argtypes = [
+            ctypes.c_void_p, ctypes.c_int, ctypes.POINTER(ctypes.c_int)]
+        self._xnvctrl.XNVCTRLQueryTargetAttribute.argtypes = [
+            ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_uint, ctypes.c_uint,
+            ctypes.POINTER(ctypes.c_int)]
+        self._xnvctrl.XNVCTRLSetTargetAttribute.argtypes = [
+            ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_uint, ctypes.c_uint, ctypes.c_int]
+        self._xnvctrl.XNVCTRLSetTargetAttribute.restype = None
+
+        self._display = self._x11.XOpenDisplay(None)  # uses $DISPLAY, like nvidia-settings
+        if not self._display:
+            raise OSError("unable to open X display")
+
+    def query_target_count(self, target_type: int) -> int:
+        count = ctypes.c_int()
+        if not self._xnvctrl.XNVCTRLQueryTargetCount(self._display, target_type, ctypes.byref(count)):
+            raise RuntimeError(f"NV-CONTROL target count query failed for target type {target_type}")
+        return count.value
+
+    def query(self, target_type: int, target_id: int, attribute: int) -> int:
+        value = ctypes.c_int()
+        if not self._xnvctrl.XNVCTRLQueryTargetAttribute(
+                self._display, target_type, target_id, 0, attribute, ctypes.byref(value)):
+            raise RuntimeError(f"NV-CONTROL query failed for attribute {attribute} on target {target_id}")
+        return value.value
+
+    def assign(self, target_type: int, target_id: int, attribute: int, value: int) -> None:
+        self._xnvctrl.XNVCTRLSetTargetAttribute(self._display, target_type, target_id, 0, attribute, value)
+        self._x11.XFlush(self._display)  # the set call only queues the request
+
+
+_xnvctrl: Optional[_XNVCtrl] = None
+_xnvctrl_unavailable = False
+
+
+def _get_xnvctrl() -> Optional[_XNVCtrl]:
+    """Return the shared NV-CONTROL bindings, or None when falling back to nvidia-settings."""
+    global _xnvctrl, _xnvctrl_unavailable
+    if _xnvctrl is None and not _xnvctrl_unavailable:
+        try:
+            _xnvctrl = _XNVCtrl()
+        except OSError as e:
+            logger.debug("NV-CONTROL bindings unavailable, falling back to nvidia-settings: %s", e)
+            _xnvctrl_unavailable = True
+    return _xnvctrl
+
+
 class ManualFanControl(AbstractContextManager):
     """ Context manager that sets manual fan control only for the duration of the context. """
     def __enter__(self):
         logger.debug("enabling manual gpu fan control")
-        run_cmd(['nvidia-settings', '--assign', 'GPUFanControlState=1'])
+        self._set_fan_control_state(1)
 
     def __exit__(self, exc_type, exc_value, traceback):
         logger.debug("disabling manual gpu fan control")
-        run_cmd(['nvidia-settings', '--assign', 'GPUFanControlState=0'])
+        self._set_fan_control_state(0)
+
+    @staticmethod
+    def _set_fan_control_state(state: int) -> None:
+        xnvctrl = _get_xnvctrl()
+        if xnvctrl is None:
+            run_cmd(['nvidia-settings', '--assign', f'GPUFanControlState={state:d}'])
+            return
+        for gpu in range(xnvctrl.query_target_count(_XNVCtrl.TARGET_TYPE_GPU)):
+            xnvctrl.assign(_XNVCtrl.TARGET_TYPE_GPU, gpu, _XNVCtrl.GPU_COOLER_MANUAL_CONTROL, state)
 
 
-def run_cmd(cmd: List[str]) -> str:
-    logger.debug("Running cmd: %s", ' '.join(cmd))
-    p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    p.wait()
+def run_cmd(cmd: Sequence[str]) -> str:
+    logger.debug("Running cmd: %s", cmd)
+    # close_fds=False lets subprocess use posix_spawn instead of fork+exec, which skips copying the
+    # parent's page tables on every invocation
+    result = subprocess.run(cmd, capture_output=True, text=True, check=False, close_fds=False)
 
-    if p.returncode:
+    if result.returncode:
         logger.critical("Unable to run cmd: %s", ' '.join(cmd))
-        if p.stderr is not None:
-            for line_bytes in p.stderr.readlines():
-                line = line_bytes.decode().strip()
-                if line:
-                    logger.error("Caught process stderr: %s", line)
-            raise subprocess.CalledProcessError(p.returncode, cmd)
+        for line in result.stderr.splitlines():
+            line = line.strip()
+            if line:
+                logger.error("Caught process stderr: %s", line)
+        raise subprocess.CalledProcessError(result.returncode, cmd)
 
-    if p.stdout is None:
-        return ''
+    return result.stdout
 
-    return p.stdout.read().decode()
+
+_nvml_handles: Optional[List] = None
+
+
+def _get_nvml_handles() -> List:
+    """Initialize NVML on first use and return the cached per-GPU device handles."""
+    global _nvml_handles
+    if _nvml_handles is None:
+        logger.debug("initializing NVML")
+        pynvml.nvmlInit()
+        _nvml_handles = [pynvml.nvmlDeviceGetHandleByIndex(i) for i in range(pynvml.nvmlDeviceGetCount())]
+    return _nvml_handles
 
 
 def get_measurements() -> List[Tuple[int, int, int]]:
-    stdout = run_cmd(['nvidia-smi', '--query-gpu=index,temperature.gpu,fan.speed', '--format=csv,noheader'])
-    measurements = re.findall(r'(\d+), (\d+), (\d+) %', stdout, flags=re.MULTILINE)
-    measurements = [tuple(map(int, values)) for values in measurements]  # parse ints
+    if pynvml is not None:
+        return [
+            (index, pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU), pynvml.nvmlDeviceGetFanSpeed(handle))
+            for index, handle in enumerate(_get_nvml_handles())]  # [(index, temperature, fanspeed)]
+
+    stdout = run_cmd(_SMI_QUERY_CMD)
+    measurements = [m for m in map(_parse_measurement, stdout.splitlines()) if m is not None]
     return measurements  # [(index, temperature, fanspeed)]
 
 
+def get_measurements_with_backoff() -> List[Tuple[int, int, int]]:
+    """
+    Same as :func:`get_measurements`, but retry with exponential backoff on failure, so that a
+    broken or reloading driver doesn't spawn a tight fail-retry loop.
+    """
+    failures = 0
+    while True:
+        try:
+            return get_measurements()
+        except Exception as e:  # NVMLError or CalledProcessError, depending on the backend
+            failures += 1
+            delay = min(3600, 2 ** failures)
+            logger.error("unable to get measurements (%d consecutive failures), retrying in %d secs: %s", failures, delay, e)
+            sleep(delay)
+
+
 def get_fan_speed(index: int) -> int:
-    fan_speed = run_cmd(['nvidia-settings', '--query', f'[fan-{index:d}]/GPUTargetFanSpeed', '--terse'])
+    xnvctrl = _get_xnvctrl()
+    if xnvctrl is None:
+        fan_speed = int(run_cmd(['nvidia-settings', '--query', f'[fan-{index:d}]/GPUTargetFanSpeed', '--terse']))
+    else:
+        fan_speed = xnvctrl.query(_XNVCtrl.TARGET_TYPE_COOLER, index, _XNVCtrl.THERMAL_COOLER_LEVEL)
     logger.debug("Current fan speed setting: [fan-%d]/GPUTargetFanSpeed=%s", index, fan_speed)
-    return int(fan_speed)
+    return fan_speed
 
 
-def set_fan_speed(index: int, fan_speed: int) -> None:
-    config = f'[fan-{index:d}]/GPUTargetFanSpeed={fan_speed:d}'
-    logger.info("Setting new fan speed: %s", config)
-    run_cmd(['nvidia-settings', '--assign', config])
+def set_fan_speeds(fan_speeds: List[Tuple[int, int]]) -> None:
+    """Assign new fan speeds, given as (index, fan_speed) pairs, without spawning one process each."""
+    if not fan_speeds:
+        return
+    for index, fan_speed in fan_speeds:
+        logger.info("Setting new fan speed: [fan-%d]/GPUTargetFanSpeed=%d", index, fan_speed)
 
+    xnvctrl = _get_xnvctrl()
+    if xnvctrl is not None:
+        for index, fan_speed in fan_speeds:
+            xnvctrl.assign(_XNVCtrl.TARGET_TYPE_COOLER, index, _XNVCtrl.THERMAL_COOLER_LEVEL, fan_speed)
+        return
 
-def create_service_file(target_temperature: int = 60, interval_secs: int = 2) -> None:
+    cmd = ['nvidia-settings']
+    for index, fan_speed in fan_speeds:
+        cmd.extend(['--assign', f'[fan-{index:d}]/GPUTargetFanSpeed={fan_speed:d}'])
+    run_cmd(cmd)
+
+
+def create_service_file(target_temperature: int = 60, interval_secs: float = 2) -> None:
     script_filepath = os.path.abspath(__file__)
     service_filepath = os.path.join(os.path.dirname(script_filepath), 'nvidia-fan-controller.service')
 
     content = SERVICE_FILE_TEMPLATE.format(
-        FILEPATH=script_filepath, TARGET_TEMPERATURE=target_temperature, INTERVAL_SECS=interval_secs, **os.environ)
+        FILEPATH=script_filepath, TARGET_TEMPERATURE=target_temperature, INTERVAL_SECS=interval_secs,
+        USER=os.environ['USER'], DISPLAY=os.environ.get('DISPLAY', ':0'),
+        XAUTHORITY=os.environ.get('XAUTHORITY', ''))
 
     logger.info("Creating/replacing service file at: %s", service_filepath)
     logger.debug("Creating/replacing service file content:\n%r", content)
@@ -228,11 +558,10 @@ def create_service_file(target_temperature: int = 60, interval_secs: int = 2) ->
 
 def main() -> None:
     import argparse
-    from time import sleep
 
     parser = argparse.ArgumentParser()
     parser.add_argument('--target-temperature', type=int, default=80, help="target max temperature (Celcius)")
-    parser.add_argument('--interval-secs', type=int, default=2, help="number of seconds between consecutive updates")
+    parser.add_argument('--interval-secs', type=float, default=2, help="number of seconds between consecutive updates (may be fractional)")
     parser.add_argument('--log-level', choices=('DEBUG', 'INFO', 'WARN'), default='INFO', help="verbosity level")
     parser.add_argument('--create-service-file', action='store_true', help="create service file and exit")
     args = parser.parse_args()
@@ -243,26 +572,73 @@ def main() -> None:
         create_service_file(target_temperature=args.target_temperature, interval_secs=args.interval_secs)
         sys.exit()
 
-    if not get_measurements():
+    initial = sorted(get_measurements())
+    if not initial:
         raise RuntimeError("no gpu detected")
 
-    # give each GPU its own controller
-    controllers = {
-        index: PIDController(x_target=args.target_temperature, u_min=10, u_max=100, u_start=max(temp / 0.9, speed), e_total_min=-10)
-        for index, temp, speed in get_measurements()}
+    # give each GPU its own controller (collapsed into one vectorized batch when numpy is available)
+    if np is None:
+        batch = None
+        controllers = [
+            PIDController(x_target=args.target_temperature, u_min=10, u_max=100, u_start=max(temp / 0.9, speed), e_total_min=-10)
+            for index, temp, speed in initial]
+    else:
+        controllers = None
+        batch = PIDControllerBatch(
+            x_target=args.target_temperature, u_min=10, u_max=100,
+            u_start=[max(temp / 0.9, speed) for index, temp, speed in initial], e_total_min=-10)
+
+    last_set: Dict[int, int] = {}  # last speed we commanded per GPU
+
+    def update(measurements: List[Tuple[int, int, int]]) -> None:
+        measurements = sorted(measurements)  # align with the batch's per-GPU state arrays
+
+        # new speeds proposed by the PID-controller(s)
+        if batch is None:
+            proposed = [controller(temp) for controller, (index, temp, _) in zip(controllers, measurements)]
+        else:
+            proposed = batch([temp for index, temp, _ in measurements])
+
+        pending = []
+        for (index, temp, current_speed), u in zip(measurements, proposed):
+            fan_speed = int(round(u))
+
+            # only update if change is non-trivial; compare against the last commanded speed where
+            # available, since the measured speed lags while the fan spins up or down
+            if fan_speed != last_set.get(index, current_speed):
+                pending.append((index, fan_speed))
+
+        set_fan_speeds(pending)
+        for index, fan_speed in pending:
+            last_set[index] = fan_speed
 
     with ManualFanControl():
-        while True:
-            for index, temp, _ in get_measurements():
-                # new speed proposed by PID-controller
-                controller = controllers[index]
-                fan_speed = int(round(controller(temp)))
-
-                # only update if change is non-trivial
-                if fan_speed != get_fan_speed(index):
-                    set_fan_speed(index, fan_speed)
-
-            sleep(args.interval_secs)
+        if pynvml is None:
+            # one persistent nvidia-smi child instead of one spawn per tick; it paces the loop itself
+            failures = 0
+            while True:
+                try:
+                    with MeasurementStream(args.interval_secs) as stream:
+                        while True:
+                            update(stream.read(len(initial)))
+                            failures = 0
+                except subprocess.CalledProcessError:
+                    failures += 1
+                    delay = min(3600, 2 ** failures)
+                    logger.error("nvidia-smi stream died (%d consecutive failures), restarting in %d secs", failures, delay)
+                    sleep(delay)
+        else:
+            # schedule against the monotonic clock so the tick spacing stays exact regardless of
+            # how long each update takes
+            next_tick = monotonic()
+            while True:
+                update(get_measurements_with_backoff())
+                next_tick += args.interval_secs
+                delay = next_tick - monotonic()
+                if delay > 0:
+                    sleep(delay)
+                else:
+                    next_tick = monotonic()  # fell behind (e.g. after backoff); resynchronize
 
 
 if __name__ == '__main__':